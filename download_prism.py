@@ -12,65 +12,183 @@ python download_prism.py \
 """
 
 
-from contextlib import contextmanager
-from datetime import datetime
-from functools import cache
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+from contextlib import closing, contextmanager
+from datetime import datetime, timedelta
+from functools import cache, lru_cache
+import ftplib
+import io
 from itertools import chain
+import json
 import logging
+import math
+import multiprocessing
+import os
 from pathlib import Path
+import queue
+import threading
+import time
 from tempfile import TemporaryDirectory
-from typing import Optional, Union, Sequence, Mapping, Iterable
+from typing import (
+    Callable,
+    Iterator,
+    Optional,
+    Union,
+    Sequence,
+    Mapping,
+    Iterable,
+    NamedTuple,
+    Tuple,
+)
+import zipfile
 
+import dask.array as dsa
 import fsspec
+import numcodecs
+import numpy as np
+import rasterio
+import rasterio.crs
+import rasterio.transform
+import rasterio.warp
+import rasterio.windows
 from retry.api import retry_call
 import rioxarray as rxr
 import xarray as xr
+import zarr
 
 
 logger = logging.getLogger(__name__)
 
+LOG_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
 
-class ZipBilFileError(Exception):
+# Target size of uncompressed chunks in output Zarr Store, in bytes.
+ZARR_CHUNK_TARGET_NBYTES = 100 * 2**20
+
+# Fill value for missing data when output is packed into int16.
+PACKED_FILLVALUE = -9999
+
+# Default scale factors for packing output into int16, by PRISM variable.
+# Packed values must stay within +/-32767 times the factor. Daily ppt (mm) can
+# exceed 327.67, so it gets coarser packing. Other variables are not packed by
+# default.
+PACK_SCALE_FACTORS = {
+    "ppt": 0.1,
+    "tmin": 0.01,
+    "tmax": 0.01,
+    "tmean": 0.01,
+    "tdmean": 0.01,
+    "vpdmin": 0.01,
+    "vpdmax": 0.01,
+}
+
+# Output Zarr Store attribute marking a store that is still being written.
+# Removed once all data is written, so a rerun knows a store with it was left
+# behind by a failed run and can be replaced.
+INCOMPLETE_ATTR = "nastyprisms_incomplete"
+
+# Suffixes of archived files needed to read a PRISM .bil. Others are metadata.
+BIL_MEMBER_SUFFIXES = (".bil", ".hdr", ".prj", ".stx")
+
+# Remote directory listings are cached here between runs.
+LISTING_CACHE_DIR = (
+    Path(os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache"))
+    / "nastyprisms"
+    / "listings"
+)
+
+# How long cached listings are used before globbing the server again. PRISM
+# keeps adding new days to the current year.
+LISTING_CACHE_TTL = timedelta(days=1)
+
+# Per-thread storage so each download thread can hold its own filesystem.
+_thread_local = threading.local()
+
+
+def _datetime_from_prism_flname(p: Path) -> datetime:
+    # Fixed YYYYMMDD so slice it rather than go through slow datetime.strptime.
+    s = p.stem.split("_")[-2]
+    return datetime(int(s[:4]), int(s[4:6]), int(s[6:8]))
+
+
+def _ensure_ftp_connection(fs: fsspec.filesystem) -> None:
     """
-    Zip archive did not have one .bil file.
+    Reconnect FTP filesystem if its connection has dropped. No-op for non-FTP
     """
+    ftp = getattr(fs, "ftp", None)
+    if ftp is None:
+        return
 
-    pass
+    # Server may have closed an idle connection, or a failed transfer may
+    # have left it in a bad state.
+    try:
+        ftp.voidcmd("NOOP")
+    except ftplib.all_errors as e:
+        logger.info(f"reconnecting to {fs.host} after {e!r}")
+        fs._connect()
 
 
-def _datetime_from_prism_flname(p: Path) -> datetime:
-    return datetime.strptime(p.stem.split("_")[-2], "%Y%m%d")
+def _cat_reconnecting(path: str, fs: fsspec.filesystem) -> bytes:
+    """
+    Read remote file into memory, first reconnecting to server if needed
+
+    Keeps reusing one long-lived connection per filesystem, so retries after
+    a dropped connection start from a working connection.
+    """
+    _ensure_ftp_connection(fs)
+    return fs.cat_file(path)
 
 
-def _dump_zippedbil(ofs: fsspec.core.OpenFiles, dumpdir: Path) -> Path:
+def fetch_prismzip_bil(
+    url: str, fs: fsspec.filesystem
+) -> Tuple[Path, Callable[[], None]]:
     """
-    Decompress .bil zip archive to local directory, return .bil path
+    Download, unpack an ESRI .bil file from a Zip archive, return path and cleanup
+
+    Same as `unpacked_prismzip_bil` but not a context manager, so the unpacked
+    files can be handed off to another thread. Call the returned cleanup
+    function once finished with the .bil file to remove the unpacked files.
 
     Raises
     ------
-    ZipBilFileError : If one .bil file is not found in the zip archive.
+    FileNotFoundError : If the Zip archive does not have the expected .bil file.
     """
-    # Also need to keep track of the actul .bil file for when we read all this.
-    bil_path: Optional[Path] = None
-
-    for fl in ofs:
-        p = Path(fl.name)
-        outpath = dumpdir.joinpath(p.name)
-        with open(outpath, mode="wb") as outfl:
-            outfl.write(fl.read())
+    # Daily Zips are only a few MB so read them straight into memory rather
+    # than spooling to a local file and reading that back.
+    zipped = retry_call(
+        _cat_reconnecting,
+        fargs=[url],
+        fkwargs={"fs": fs},
+        exceptions=(TimeoutError, EOFError, ConnectionError, ftplib.error_temp),
+        tries=3,
+        delay=30,
+        backoff=2,
+        logger=logger,
+    )
 
-        # Check if this file is a .bil. There should only be one .bil file in zip archive.
-        if p.suffix == ".bil":
-            if bil_path is not None:
-                raise ZipBilFileError(
-                    f"zip archive contains multiple .bil files: {bil_path}, {outpath}"
-                )
-            bil_path = outpath
+    # PRISM names the archived .bil after the Zip, e.g. "PRISM_..._bil.zip"
+    # holds "PRISM_..._bil.bil".
+    bil_name = Path(url).with_suffix(".bil").name
 
-    if bil_path is None:
-        raise ZipBilFileError(f"zip archive did not have a .bil file")
+    tmpdir_obj = TemporaryDirectory()
+    try:
+        tmpdir = Path(tmpdir_obj.name)
+        with zipfile.ZipFile(io.BytesIO(zipped)) as zf:
+            members = [
+                m for m in zf.namelist() if Path(m).suffix in BIL_MEMBER_SUFFIXES
+            ]
+            if bil_name not in members:
+                raise FileNotFoundError(f"{url} does not contain {bil_name}")
+            zf.extractall(tmpdir, members=members)
+    except BaseException:
+        tmpdir_obj.cleanup()
+        raise
 
-    return bil_path
+    return tmpdir.joinpath(bil_name), tmpdir_obj.cleanup
 
 
 @contextmanager
@@ -80,41 +198,46 @@ def unpacked_prismzip_bil(url: str, fs: fsspec.filesystem) -> Path:
 
     Note that this uncompresses the Zip at the URL into a local directory because
     the goal is to read the archived .bil file. Reading the .bil file
-    requires all the additional archived files to be decompressed and in the
-    same directory as the .bil.
+    requires the additional archived files describing it (.hdr, .prj, .stx)
+    to be decompressed and in the same directory as the .bil. Other archived
+    files are skipped.
 
     Raises
     ------
-    ZipBilFileError : If one .bil file is not found in the zip archive.
-    """
-    with TemporaryDirectory() as tmpdir:
-        tmpdir = Path(tmpdir)
-        # Download zip, then unzip. More reliable than chaining these together.
-        tmpzip_path = tmpdir.joinpath(Path(url).name)
-
-        retry_call(
-            fs.get_file,
-            fkwargs={"rpath": url, "lpath": tmpzip_path},
-            exceptions=(TimeoutError,),
-            tries=3,
-            delay=30,
-            backoff=2,
-            logger=logger,
-        )
+    FileNotFoundError : If the Zip archive does not have the expected .bil file.
+    """
+    target_bil_path, cleanup = fetch_prismzip_bil(url, fs=fs)
+    try:
+        yield target_bil_path
+    finally:
+        cleanup()
+
+
+def _read_cached_listing(path: Path, ttl: timedelta) -> Optional[Tuple[str, ...]]:
+    """
+    Read listing cached at `path`, or None if missing or older than `ttl`
+    """
+    try:
+        age = timedelta(seconds=time.time() - path.stat().st_mtime)
+        if age > ttl:
+            return None
+        return tuple(json.loads(path.read_text()))
+    except (OSError, ValueError):
+        return None
 
-        with fsspec.open_files(f"zip://*::{tmpzip_path}") as zipped_files:
-            # This is creating problems. Getting EOFErrors after ****0110. Feels
-            # like a connections is being left open or something.
-            # Errors even if refactor as context manager.
-            # zipped_files = fsspec.open_files(
-            #     f"zip://*::simplecache::{url}",
-            #     simplecache={"cache_storage": cachepath}
-            # )
-            target_bil_path = _dump_zippedbil(
-                zipped_files,
-                dumpdir=Path(tmpdir),
-            )
-            yield target_bil_path
+
+def _write_cached_listing(path: Path, urls: Sequence[str]) -> None:
+    """
+    Cache listing to `path`. Only logs a warning if the cache can't be written
+    """
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write then move so concurrent runs never read a partial file.
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp_path.write_text(json.dumps(list(urls)))
+        tmp_path.replace(path)
+    except OSError as e:
+        logger.warning(f"could not cache listing to {path}: {e}")
 
 
 @cache
@@ -132,13 +255,121 @@ def get_prism_daily_urls(
 
     We do this for a single year because daily PRISM Zips are stored in annual
     directories on the remote server.
+
+    Globbing the remote server can be slow so listings are also cached on disk
+    in `LISTING_CACHE_DIR` and reused by later runs for `LISTING_CACHE_TTL`.
+    Empty listings are not cached.
     """
+    host = getattr(fs, "host", "localhost")
+    cache_path = LISTING_CACHE_DIR.joinpath(
+        f"{host}_{variable}_{stability}_{scale}{version}_{year}.json"
+    )
+    urls = _read_cached_listing(cache_path, ttl=LISTING_CACHE_TTL)
+    if urls is not None:
+        logger.debug(f"using cached listing {cache_path}")
+        return urls
+
     target_file_glob = f"/daily/{variable}/{year}/PRISM_{variable}_{stability}_{scale}{version}_{year}*_bil.zip"
-    return fs.glob(target_file_glob)
+    urls = tuple(fs.glob(target_file_glob))
+    # An empty listing may be a transient server error or a year not yet
+    # published, so don't cache it.
+    if not urls:
+        logger.warning(f"found no files for {year=} matching {target_file_glob}")
+        return urls
+    _write_cached_listing(cache_path, urls)
+    return urls
+
+
+@lru_cache
+def _needs_reprojection(
+    src_crs_wkt: str,
+    src_transform: rasterio.Affine,
+    src_shape: Tuple[int, int],
+    dst_crs: str,
+    tolerance: float = 0.1,
+) -> bool:
+    """
+    Check whether reprojecting raster grid to `dst_crs` would actually move it
+
+    Returns False if the CRSs are the same, or if both are geographic and
+    moving the raster bounds between them shifts nothing by more than
+    `tolerance` pixels. For example, NAD83 to WGS84 is a shift of a couple
+    meters, far less than a 4 km PRISM pixel.
+    """
+    src = rasterio.crs.CRS.from_wkt(src_crs_wkt)
+    dst = rasterio.crs.CRS.from_user_input(dst_crs)
+    if src == dst:
+        return False
+    if not (src.is_geographic and dst.is_geographic):
+        return True
+
+    height, width = src_shape
+    bounds = rasterio.transform.array_bounds(height, width, src_transform)
+    dst_bounds = rasterio.warp.transform_bounds(src, dst, *bounds)
+    shift = max(abs(a - b) for a, b in zip(bounds, dst_bounds))
+    pixel_size = min(abs(src_transform.a), abs(src_transform.e))
+    return shift > tolerance * pixel_size
+
+
+@lru_cache
+def _reproject_grid(
+    src_crs_wkt: str,
+    src_transform: rasterio.Affine,
+    src_shape: Tuple[int, int],
+    dst_crs: str,
+) -> Tuple[rasterio.Affine, Tuple[int, int]]:
+    """
+    Get transform and shape of raster grid reprojected to `dst_crs`
+
+    Cached because every daily PRISM raster shares the same grid, so the
+    destination grid only needs to be worked out once.
+    """
+    height, width = src_shape
+    bounds = rasterio.transform.array_bounds(height, width, src_transform)
+    dst_transform, dst_width, dst_height = rasterio.warp.calculate_default_transform(
+        src_crs_wkt, dst_crs, width, height, *bounds
+    )
+    return dst_transform, (dst_height, dst_width)
+
+
+@lru_cache(maxsize=1)
+def _clip_window(
+    transform: rasterio.Affine,
+    shape: Tuple[int, int],
+    minlon: float,
+    minlat: float,
+    maxlon: float,
+    maxlat: float,
+) -> Tuple[slice, slice]:
+    """
+    Get row and column slices of raster grid covering a bounding box
+
+    Includes any pixel partially covered by the box, like
+    ``DataArray.rio.clip_box``. Every daily PRISM raster shares the same grid
+    and box, so only the last window is cached and the first file does the
+    work.
+
+    Raises
+    ------
+    ValueError : If the bounding box does not cover any pixels.
+    """
+    height, width = shape
+    window = rasterio.windows.from_bounds(
+        minlon, minlat, maxlon, maxlat, transform=transform
+    )
+    (row_start, row_stop), (col_start, col_stop) = window.toranges()
+    rows = slice(max(math.floor(row_start), 0), min(math.ceil(row_stop), height))
+    cols = slice(max(math.floor(col_start), 0), min(math.ceil(col_stop), width))
+    if rows.start >= rows.stop or cols.start >= cols.stop:
+        raise ValueError(
+            f"no raster data in bounds {minlon=}, {minlat=}, {maxlon=}, {maxlat=}"
+        )
+    return rows, cols
 
 
 def preprocess_bil_dataarray(
     da: xr.DataArray,
+    timestamp: datetime,
     minlat: float = 32.0,
     minlon: float = -125.0,
     maxlat: float = 43.0,
@@ -146,17 +377,32 @@ def preprocess_bil_dataarray(
     project_epsg: Optional[str] = "4326",
 ) -> xr.DataArray:
     """
-    Clean, standardize input DataArray. Assumes it has `source_url` in attrs.
+    Clean, standardize input DataArray, adding `timestamp` as its time dim.
     """
-    # Not reprojecting because WGS84 and NAD83 are likely going to have a
-    # difference of a couple meters.
-    if project_epsg is not None:
-        da = da.rio.reproject(f"EPSG:{project_epsg}")
+    # Not reprojecting if it would hardly move anything, e.g. WGS84 and NAD83
+    # are likely going to have a difference of a couple meters. A warp would
+    # cost a full resampling pass for nothing.
+    grid = (da.rio.crs.to_wkt(), da.rio.transform(), da.rio.shape)
+    if project_epsg is not None and _needs_reprojection(*grid, f"EPSG:{project_epsg}"):
+        dst_crs = f"EPSG:{project_epsg}"
+        dst_transform, dst_shape = _reproject_grid(*grid, dst_crs)
+        da = da.rio.reproject(
+            dst_crs,
+            shape=dst_shape,
+            transform=dst_transform,
+            # Parallelism comes from preprocessing several files at once in
+            # worker processes. More warp threads would oversubscribe CPUs.
+            num_threads=1,
+        )
 
     # Generous box over California. Clipping too close has created an issue
     # when we apply population segment weights and aggregate the data to
     # census tracts.
-    da = da.rio.clip_box(minx=minlon, miny=minlat, maxx=maxlon, maxy=maxlat)
+    # Plain index slicing. Much cheaper than rio.clip_box for the same pixels.
+    rows, cols = _clip_window(
+        da.rio.transform(), da.rio.shape, minlon, minlat, maxlon, maxlat
+    )
+    da = da.isel(y=rows, x=cols)
 
     # Drop unused dimension/coords. This causes data to loose its CRS so
     # cannot do referenced spatial stuff after this.
@@ -164,14 +410,407 @@ def preprocess_bil_dataarray(
 
     da = da.rename({"x": "lon", "y": "lat"})
 
-    # Add time dim from source data URL path.
-    source_url = Path(da.attrs["source_url"])
-    da = da.expand_dims("time").assign_coords(
-        time=("time", [_datetime_from_prism_flname(source_url)])
-    )
+    da = da.expand_dims("time").assign_coords(time=("time", [timestamp]))
     return da
 
 
+@lru_cache
+def _pixel_centers(
+    transform: rasterio.Affine,
+    row_start: int,
+    row_stop: int,
+    col_start: int,
+    col_stop: int,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Get y, x coordinates of pixel centers for rows and columns of a raster grid
+    """
+    y = transform.f + (np.arange(row_start, row_stop) + 0.5) * transform.e
+    x = transform.c + (np.arange(col_start, col_stop) + 0.5) * transform.a
+    # Shared between calls so guard against changes.
+    y.flags.writeable = False
+    x.flags.writeable = False
+    return y, x
+
+
+class _BilHeader(NamedTuple):
+    """
+    Layout of a single band ESRI .bil raster, from its .hdr file.
+    """
+
+    nrows: int
+    ncols: int
+    dtype: np.dtype
+    skipbytes: int
+    rowbytes: int
+    transform: rasterio.Affine
+    nodata: Optional[float]
+
+
+@lru_cache
+def _parse_bil_header(text: str) -> _BilHeader:
+    """
+    Parse ESRI .hdr text describing a single band .bil raster
+
+    Cached on the text because every daily PRISM .hdr is the same.
+
+    Raises
+    ------
+    ValueError : If the raster is not a single band of a supported pixel type.
+    """
+    fields = {}
+    for line in text.splitlines():
+        parts = line.split()
+        if len(parts) >= 2:
+            fields[parts[0].upper()] = parts[1]
+
+    if int(fields.get("NBANDS", 1)) != 1:
+        raise ValueError(f"only single band .bil supported, got {fields['NBANDS']}")
+
+    nbits = int(fields.get("NBITS", 8))
+    pixeltype = fields.get("PIXELTYPE", "UNSIGNEDINT").upper()
+    kind = {"FLOAT": "f", "SIGNEDINT": "i"}.get(pixeltype, "u")
+    if nbits not in (8, 16, 32, 64) or (kind == "f" and nbits < 32):
+        raise ValueError(f"unsupported .bil pixel type {pixeltype} {nbits=}")
+    # BYTEORDER is "I" (Intel) for little-endian or "M" (Motorola) for big-endian.
+    byteorder = ">" if fields.get("BYTEORDER", "I").upper().startswith("M") else "<"
+    dtype = np.dtype(f"{byteorder}{kind}{nbits // 8}")
+
+    nrows, ncols = int(fields["NROWS"]), int(fields["NCOLS"])
+    xdim, ydim = float(fields["XDIM"]), float(fields["YDIM"])
+    # ULXMAP, ULYMAP are the center of the upper-left pixel, not its corner.
+    transform = rasterio.Affine(
+        xdim,
+        0.0,
+        float(fields["ULXMAP"]) - xdim / 2,
+        0.0,
+        -ydim,
+        float(fields["ULYMAP"]) + ydim / 2,
+    )
+    nodata = float(fields["NODATA"]) if "NODATA" in fields else None
+
+    return _BilHeader(
+        nrows=nrows,
+        ncols=ncols,
+        dtype=dtype,
+        skipbytes=int(fields.get("SKIPBYTES", 0)),
+        rowbytes=int(fields.get("TOTALROWBYTES", ncols * dtype.itemsize)),
+        transform=transform,
+        nodata=nodata,
+    )
+
+
+def _read_clipped_bil(
+    bil_path: Path,
+    minlat: float = 32.0,
+    minlon: float = -125.0,
+    maxlat: float = 43.0,
+    maxlon: float = -114.0,
+    project_epsg: Optional[str] = "4326",
+) -> Optional[xr.DataArray]:
+    """
+    Read only pixels of .bil within a bounding box, or None if it needs reprojecting
+
+    Same result as ``preprocess_bil_dataarray`` without the time dimension,
+    but skips GDAL and rioxarray entirely. The .bil is a flat binary raster
+    described by its .hdr, so it is memory-mapped and only the clipped
+    pixels are copied out. Nodata is masked as NaN.
+
+    Raises
+    ------
+    ValueError : If the raster is not a single band of a supported pixel type.
+    """
+    header = _parse_bil_header(bil_path.with_suffix(".hdr").read_text())
+    shape = (header.nrows, header.ncols)
+
+    if project_epsg is not None:
+        crs_wkt = bil_path.with_suffix(".prj").read_text()
+        if _needs_reprojection(
+            crs_wkt, header.transform, shape, f"EPSG:{project_epsg}"
+        ):
+            return None
+
+    rows, cols = _clip_window(header.transform, shape, minlon, minlat, maxlon, maxlat)
+
+    raster = np.memmap(
+        bil_path,
+        dtype=header.dtype,
+        mode="r",
+        offset=header.skipbytes,
+        shape=(header.nrows, header.rowbytes // header.dtype.itemsize),
+    )
+    # Copy the clipped pixels out of the map, in native byte order, so
+    # nothing refers to the file after this.
+    data = raster[rows, cols].astype(
+        np.result_type(header.dtype.newbyteorder("="), np.float32)
+    )
+    del raster
+    if header.nodata is not None:
+        data[data == header.nodata] = np.nan
+
+    lat, lon = _pixel_centers(
+        header.transform, rows.start, rows.stop, cols.start, cols.stop
+    )
+    return xr.DataArray(data, dims=("lat", "lon"), coords={"lat": lat, "lon": lon})
+
+
+def _thread_filesystem(protocol: str, host: str) -> fsspec.AbstractFileSystem:
+    """
+    Get filesystem for the current thread, creating it on first use
+
+    FTP connections are not thread-safe so each download thread gets its own
+    filesystem instance, and so its own connection.
+    """
+    filesystems = getattr(_thread_local, "filesystems", None)
+    if filesystems is None:
+        filesystems = _thread_local.filesystems = {}
+
+    key = (protocol, host)
+    if key not in filesystems:
+        filesystems[key] = fsspec.filesystem(
+            protocol=protocol, host=host, timeout=300, skip_instance_cache=True
+        )
+    return filesystems[key]
+
+
+def _prefetch_prismzip_bils(
+    urls: Sequence[str],
+    *,
+    protocol: str,
+    host: str,
+    workers: int = 1,
+    maxsize: int = 2,
+) -> Iterator[Tuple[str, Path, Callable[[], None]]]:
+    """
+    Download, unpack daily PRISM Zips in background threads, yield as they finish
+
+    Yields ``(url, bil_path, cleanup)``. Call ``cleanup()`` once finished with
+    ``bil_path``. Downloads run ahead of the caller so FTP transfers overlap
+    with whatever the caller does with each file, but no more than `maxsize`
+    unpacked archives sit waiting, plus one per worker, so local disk use
+    stays bounded.
+
+    Raises
+    ------
+    FileNotFoundError : If a Zip archive does not have the expected .bil file.
+    """
+    ready = queue.Queue(maxsize=maxsize)
+    stop = threading.Event()
+
+    def download(url):
+        if stop.is_set():
+            return
+
+        try:
+            bil_path, cleanup = fetch_prismzip_bil(
+                url, fs=_thread_filesystem(protocol, host)
+            )
+            logger.info(f"unpacked {protocol}://{host}{url}")
+            item = (url, bil_path, cleanup)
+        except Exception as e:
+            item = e
+
+        # Poll so we can give up if the consumer stops reading.
+        while not stop.is_set():
+            try:
+                ready.put(item, timeout=1)
+                return
+            except queue.Full:
+                continue
+        if not isinstance(item, Exception):
+            item[2]()
+
+    executor = ThreadPoolExecutor(max_workers=workers)
+    try:
+        for url in urls:
+            executor.submit(download, url)
+
+        for _ in urls:
+            item = ready.get()
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        executor.shutdown(wait=True, cancel_futures=True)
+        # Clean up anything that was unpacked but never handed out.
+        while not ready.empty():
+            item = ready.get_nowait()
+            if not isinstance(item, Exception):
+                item[2]()
+
+
+def _init_worker_logging(level: int) -> None:
+    """
+    Configure logging in a spawned preprocessing worker like its parent
+    """
+    logging.basicConfig(format=LOG_FORMAT, level=level)
+
+
+def _process_one(
+    bil_path: Path,
+    *,
+    timestamp: datetime,
+    variable: str,
+    preprocess_kwargs: Mapping,
+) -> xr.DataArray:
+    """
+    Load and preprocess unpacked daily PRISM .bil for `timestamp` into memory
+    """
+    logger.debug(f"processing {bil_path}")
+
+    da = _read_clipped_bil(bil_path, **preprocess_kwargs)
+    if da is not None:
+        da.name = variable
+        return da.expand_dims("time").assign_coords(time=("time", [timestamp]))
+
+    # Needs reprojecting so take the slower road through rioxarray.
+    # Mask nodata as NaN so it is not mistaken for data when packing output.
+    da = rxr.open_rasterio(bil_path, mask_and_scale=True)
+    da.name = variable
+
+    da = preprocess_bil_dataarray(da, timestamp, **preprocess_kwargs)
+
+    # Load now, before the unpacked .bil is cleaned up.
+    return da.load()
+
+
+def _time_chunksize(
+    ntime: int,
+    nlat: int,
+    nlon: int,
+    itemsize: int,
+    target_nbytes: int = ZARR_CHUNK_TARGET_NBYTES,
+) -> int:
+    """
+    Length of time chunks so each chunk is about `target_nbytes`
+
+    Chunks always cover the full lat/lon grid and grow along time, so reading
+    long time series at a location touches few chunks. There is always at
+    least one time step per chunk and never more than `ntime`.
+    """
+    step_nbytes = nlat * nlon * itemsize
+    return max(1, min(ntime, target_nbytes // step_nbytes))
+
+
+def _init_zarr_store(
+    outpath: str,
+    template: xr.DataArray,
+    times: Sequence[datetime],
+    pack_scale_factor: Optional[float] = None,
+) -> int:
+    """
+    Create empty Zarr Store at `outpath` to hold `template`'s grid at all `times`
+
+    Only metadata and coordinates are written. The data variable is left
+    empty so daily data can later be written into it by region. Returns the
+    length of the data variable's chunks along time.
+
+    The store is marked incomplete until `_mark_zarr_store_complete` is
+    called. An incomplete store already at `outpath` is replaced, but a
+    complete store is not.
+
+    If `pack_scale_factor` is given, data is stored packed as int16 with
+    this CF `scale_factor`, which xarray decodes on read.
+    """
+    encoding = {
+        "compressor": numcodecs.Blosc(
+            cname="zstd", clevel=3, shuffle=numcodecs.Blosc.SHUFFLE
+        ),
+    }
+    itemsize = template.dtype.itemsize
+    if pack_scale_factor is not None:
+        encoding |= {
+            "dtype": "int16",
+            # No add_offset. With one, xarray decodes int16 to float64
+            # rather than float32, doubling memory for readers.
+            "scale_factor": pack_scale_factor,
+            "_FillValue": PACKED_FILLVALUE,
+        }
+        itemsize = np.dtype("int16").itemsize
+
+    nlat, nlon = template.sizes["lat"], template.sizes["lon"]
+    time_chunk = _time_chunksize(len(times), nlat, nlon, itemsize)
+    chunks = (time_chunk, nlat, nlon)
+    encoding["chunks"] = chunks
+    logger.debug(f"output chunks {chunks=}")
+
+    empty = dsa.empty((len(times), nlat, nlon), chunks=chunks, dtype=template.dtype)
+    ds = xr.Dataset(
+        {template.name: (("time", "lat", "lon"), empty, template.attrs)},
+        coords={"time": list(times), "lat": template["lat"], "lon": template["lon"]},
+        attrs={INCOMPLETE_ATTR: 1},
+    )
+
+    mode = "w-"
+    if _is_incomplete_zarr_store(outpath):
+        logger.warning(f"replacing incomplete Zarr store {outpath} from failed run")
+        mode = "w"
+    ds.to_zarr(outpath, mode=mode, compute=False, encoding={template.name: encoding})
+    return time_chunk
+
+
+def _is_incomplete_zarr_store(outpath: str) -> bool:
+    """
+    Is there a Zarr Store at `outpath` left incomplete by a failed run?
+    """
+    try:
+        group = zarr.open_group(outpath, mode="r")
+    except zarr.errors.GroupNotFoundError:
+        return False
+    return INCOMPLETE_ATTR in group.attrs
+
+
+def _mark_zarr_store_complete(outpath: str) -> None:
+    """
+    Mark Zarr Store at `outpath` as completely written
+    """
+    group = zarr.open_group(outpath, mode="r+")
+    del group.attrs[INCOMPLETE_ATTR]
+    # Keep consolidated metadata in step with the removed attribute.
+    zarr.consolidate_metadata(outpath)
+
+
+def _check_packable(da: xr.DataArray, scale_factor: float) -> None:
+    """
+    Check `da` fits in int16 when packed with `scale_factor`
+
+    Raises
+    ------
+    ValueError : If packing would overflow int16, which would otherwise
+        silently wrap around.
+    """
+    limit = np.iinfo("int16").max * scale_factor
+    vmin, vmax = float(da.min()), float(da.max())
+    if vmin < -limit or vmax > limit:
+        raise ValueError(
+            f"{da.name} values in [{vmin}, {vmax}] cannot be packed into int16 "
+            f"with scale factor {scale_factor}, try a larger scale factor"
+        )
+
+
+def _write_region(
+    data: np.ndarray,
+    outpath: str,
+    *,
+    variable: str,
+    start: int,
+) -> None:
+    """
+    Write (time, lat, lon) data into existing output Zarr Store from time `start`
+
+    Only the data is written. Coords and attrs are already in the store.
+    """
+    stop = start + data.shape[0]
+    xr.Dataset({variable: (("time", "lat", "lon"), data)}).to_zarr(
+        outpath,
+        region={"time": slice(start, stop)},
+        mode="r+",
+        # Metadata doesn't change so don't rewrite it for every write.
+        consolidated=False,
+    )
+
+
 def main(
     years: Sequence[int],
     *,
@@ -183,9 +822,25 @@ def main(
     host: str = "ftp.prism.oregonstate.edu",
     protocol: str = "ftp",
     preprocess_kwargs: Optional[Mapping] = None,
+    downloads: int = 8,
+    workers: Optional[int] = None,
+    pack_scale_factor: Union[float, str, None] = "auto",
 ) -> None:
     """
     Download and process years of daily PRISM data, output Zarr Store
+
+    Daily files are downloaded concurrently by `downloads` threads, each with
+    its own connection to `host`, while `workers` processes preprocess
+    already downloaded files. `workers` defaults to the number of CPUs.
+    Preprocessed days are written directly into the output Zarr Store, a full
+    chunk at a time. Workers are spawned processes, so scripts calling this
+    need an ``if __name__ == "__main__":`` guard.
+
+    Output is packed into int16 with `pack_scale_factor`, unless it is None.
+    If "auto", the factor for `variable` is taken from `PACK_SCALE_FACTORS`.
+
+    The output store is marked incomplete until all data is written. If a run
+    fails, rerunning with the same `outpath` replaces the incomplete store.
     """
     fs = fsspec.filesystem(protocol=protocol, host=host, timeout=300)
 
@@ -199,49 +854,136 @@ def main(
         "stability": stability,
     }
 
+    # Drop repeated URLs, e.g. from repeated years, so each day is only
+    # processed once.
     all_urls = tuple(
-        chain.from_iterable(
-            (get_prism_daily_urls(yr, fs=fs, **prism_kwargs) for yr in years)
+        dict.fromkeys(
+            chain.from_iterable(
+                (get_prism_daily_urls(yr, fs=fs, **prism_kwargs) for yr in years)
+            )
         )
     )
     n = len(all_urls)
     logger.info(f"found {n=} files to process")
 
-    with TemporaryDirectory() as tmpdir:
-        tmpdir = Path(tmpdir)
-        # Process all of the daily BIL files, outputting cleaned intermediate annual
-        # files to a single local directory...
-        daily_paths = []
-        for url in all_urls:
-            with unpacked_prismzip_bil(url, fs=fs) as bil_path:
-                logger.info(f"unpacked {protocol}://{host}{url}")
-                logger.debug(f"processing {bil_path}")
-
-                da = rxr.open_rasterio(bil_path)
-                da.name = variable
-                da.attrs["source_url"] = str(url)
-
-                # We preprocess these now rather than in open_mfdataset below
-                # because this step includes spatial clipping, reducing the
-                # volume of intermediate files stored to disk.
-                da = preprocess_bil_dataarray(da, **preprocess_kwargs)
-
-                daily_outpath = tmpdir.joinpath(bil_path.name).with_suffix(".nc")
-                da.to_dataset().to_netcdf(daily_outpath)
-                daily_paths.append(daily_outpath)
-                logger.debug(f"{daily_outpath=}")
-
-        logger.info(f"combining annual files to output Zarr store")
-        ds = xr.open_mfdataset(
-            daily_paths,
-            parallel=True,
+    # Position of each daily file along the output time dimension.
+    timestamps = {url: _datetime_from_prism_flname(Path(url)) for url in all_urls}
+    times = sorted(set(timestamps.values()))
+    time_index = {t: i for i, t in enumerate(times)}
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    if pack_scale_factor == "auto":
+        pack_scale_factor = PACK_SCALE_FACTORS.get(variable)
+    logger.debug(f"packing output with {pack_scale_factor=}")
+
+    def check(da):
+        if pack_scale_factor is not None:
+            _check_packable(da, pack_scale_factor)
+        return da
+
+    # Days are buffered until all days of an output chunk are ready, then the
+    # chunk is written once. Writing day by day would decompress, update and
+    # recompress the same chunk for every day in it. Maps chunk number to
+    # {time index: daily data}.
+    chunk_buffers = {}
+
+    def buffer_and_write(url, da):
+        i = time_index[timestamps[url]]
+        c = i // time_chunk
+        buffer = chunk_buffers.setdefault(c, {})
+        buffer[i] = da.data
+
+        start, stop = c * time_chunk, min((c + 1) * time_chunk, len(times))
+        if len(buffer) == stop - start:
+            data = np.concatenate([buffer[j] for j in range(start, stop)])
+            _write_region(data, outpath, variable=variable, start=start)
+            del chunk_buffers[c]
+            logger.debug(f"wrote time index {start} to {stop} to {outpath}")
+
+    # Downloads are mostly waiting on the FTP server so they run in background
+    # threads, prefetching files while worker processes preprocess the ones
+    # already downloaded. Preprocessing is CPU-bound and much of it holds the
+    # GIL, so it needs processes to use more than one core. Only paths to
+    # unpacked files go to the workers; clipped daily arrays come back and are
+    # written from here, a chunk at a time. Workers are spawned rather than
+    # forked because this process is already running download threads. Close
+    # explicitly so background downloads stop if processing fails.
+    with closing(
+        _prefetch_prismzip_bils(
+            all_urls, protocol=protocol, host=host, workers=downloads
+        )
+    ) as prefetched, ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker_logging,
+        initargs=(logging.getLogger().getEffectiveLevel(),),
+    ) as executor:
+        # Need one preprocessed file to know the output grid, so we can
+        # create the full, empty output store up front.
+        first = next(prefetched, None)
+        if first is None:
+            raise FileNotFoundError("no daily PRISM files found to process")
+        url, bil_path, cleanup = first
+        try:
+            da = _process_one(
+                bil_path,
+                timestamp=timestamps[url],
+                variable=variable,
+                preprocess_kwargs=preprocess_kwargs,
+            )
+        finally:
+            cleanup()
+        check(da)
+        logger.info(f"initializing output Zarr store {outpath}")
+        time_chunk = _init_zarr_store(
+            outpath,
+            template=da,
+            times=times,
+            pack_scale_factor=pack_scale_factor,
+        )
+        buffer_and_write(url, da)
+
+        # Maps pending future to the URL it is preprocessing and the cleanup
+        # for its unpacked files, which is called here once the worker is done.
+        pending = {}
+
+        def collect(future):
+            url, cleanup = pending.pop(future)
+            try:
+                da = future.result()
+            finally:
+                cleanup()
+            buffer_and_write(url, check(da))
+
+        for url, bil_path, cleanup in prefetched:
+            future = executor.submit(
+                _process_one,
+                bil_path,
+                timestamp=timestamps[url],
+                variable=variable,
+                preprocess_kwargs=preprocess_kwargs,
+            )
+            pending[future] = (url, cleanup)
+            # Don't let unpacked files pile up waiting for a free worker.
+            if len(pending) >= workers:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    collect(future)
+        for future in list(pending):
+            collect(future)
+
+    # Don't mark a store with missing days as complete.
+    if chunk_buffers:
+        first = times[min(chunk_buffers) * time_chunk]
+        raise RuntimeError(
+            f"{len(chunk_buffers)} output chunks were never written to {outpath}, "
+            f"first starting {first:%Y-%m-%d}"
         )
-        print(ds)  # DEBUG
-        # `ds` must be written to disk or loaded to memory before the
-        # func returns. Otherwise this conflicts with tmp directory cleanup
-        # and input data is lost.
-        ds.to_zarr(outpath)
-        logger.info(f"output written to {outpath}")
+
+    _mark_zarr_store_complete(outpath)
+    logger.info(f"output written to {outpath}")
 
 
 if __name__ == "__main__":
@@ -261,14 +1003,15 @@ if __name__ == "__main__":
         default="minlon=-125.0,minlat=32.0,maxlon=-114.0,maxlat=43.0",
     )
     parser.add_argument("--epsg", type=str, default="4326")
+    parser.add_argument("--pack-scale-factor", type=str, default="auto")
     parser.add_argument("--host", type=str, default="ftp.prism.oregonstate.edu")
     parser.add_argument("--protocol", type=str, default="ftp")
+    parser.add_argument("--downloads", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=None)
     parser.add_argument("--loglevel", type=str, default="info")
     args = parser.parse_args()
 
-    logging.basicConfig(
-        format="%(asctime)s - %(levelname)s - %(message)s", level=args.loglevel.upper()
-    )
+    logging.basicConfig(format=LOG_FORMAT, level=args.loglevel.upper())
 
     logger.info(f"starting work")
     logger.debug(f"starting work with {args=}")
@@ -282,6 +1025,12 @@ if __name__ == "__main__":
         epsg_arg = None
     preprocess_kwargs["project_epsg"] = epsg_arg
 
+    pack_scale_factor_arg = args.pack_scale_factor.lower()
+    if pack_scale_factor_arg == "none":
+        pack_scale_factor_arg = None
+    elif pack_scale_factor_arg != "auto":
+        pack_scale_factor_arg = float(pack_scale_factor_arg)
+
     main(
         range(args.firstyear, args.lastyear + 1),
         variable=args.variable,
@@ -292,5 +1041,8 @@ if __name__ == "__main__":
         host=args.host,
         protocol=args.protocol,
         preprocess_kwargs=preprocess_kwargs,
+        downloads=args.downloads,
+        workers=args.workers,
+        pack_scale_factor=pack_scale_factor_arg,
     )
     logger.info("done")